@@ -5,37 +5,84 @@ AI-Powered Code Review Agent - Web Application
 A comprehensive code review system with multi-agent architecture,
 security analysis, code quality metrics, and AI-powered suggestions.
 
-Run with: python code_review_agent.py
+Run with: python code_review_agent.py (development server)
+Production: gunicorn --preload -w 4 -k gthread --threads 16 -b 0.0.0.0:5000 wsgi:app
 Access at: http://localhost:5000
 """
 
 import os
 import sys
 import ast
+import asyncio
+import random
 import re
+import secrets
+import bisect
 import json
+import queue
 import hashlib
 import time
-from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, field
+import threading
+from collections import OrderedDict, deque
+from itertools import accumulate
+from operator import methodcaller
+from functools import lru_cache
+from typing import Dict, Iterator, List, Any, Optional, Set, Tuple, Union
+from dataclasses import dataclass, field, replace
 from enum import Enum
 from abc import ABC, abstractmethod
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 warnings.filterwarnings('ignore')
 
 # Flask for web server
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, send_from_directory, session, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
 
 # Try to import Google Generative AI
 try:
     import google.generativeai as genai
+    from google.generativeai import client as genai_client
     GENAI_AVAILABLE = True
 except ImportError:
     GENAI_AVAILABLE = False
     print("⚠️ google-generativeai not installed. Run: pip install google-generativeai")
 
+# Gemini errors that are worth retrying (throttling, timeouts, server errors)
+try:
+    from google.api_core import exceptions as google_exceptions
+    GEMINI_TRANSIENT_ERRORS: Tuple[type, ...] = (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+    )
+except ImportError:
+    GEMINI_TRANSIENT_ERRORS = ()
+
+# Optional: load GOOGLE_API_KEY and other settings from a local .env file
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+# Optional: orjson serializes API responses faster than the json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional: Hyperscan accelerates the multi-pattern security scan
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
 # ============================================================
 # ENUMS AND CONSTANTS
 # ============================================================
@@ -85,34 +132,129 @@ SEVERITY_CSS = {
     Severity.INFO: "info"
 }
 
-# Security patterns to detect
+# Flat lookup tables for serialization: (value, css class, icon) per severity
+SEVERITY_INFO = {s: (s.value, SEVERITY_CSS[s], SEVERITY_COLORS[s]) for s in Severity}
+CATEGORY_VALUES = {c: c.value for c in IssueCategory}
+
+# Security patterns to detect. Each pattern is matched against the whole
+# buffer in one pass, so it must not be able to cross a line break.
 SECURITY_PATTERNS = {
     "python": {
-        r"eval\s*\(": ("Use of eval()", Severity.CRITICAL),
-        r"exec\s*\(": ("Use of exec()", Severity.CRITICAL),
-        r"os\.system\s*\(": ("Use of os.system()", Severity.HIGH),
-        r"subprocess\.call\s*\(.*shell\s*=\s*True": ("Shell injection risk", Severity.CRITICAL),
+        r"eval[ \t]*\(": ("Use of eval()", Severity.CRITICAL),
+        r"exec[ \t]*\(": ("Use of exec()", Severity.CRITICAL),
+        r"os\.system[ \t]*\(": ("Use of os.system()", Severity.HIGH),
+        r"subprocess\.call[ \t]*\(.*shell[ \t]*=[ \t]*True": ("Shell injection risk", Severity.CRITICAL),
         r"pickle\.loads?": ("Unsafe deserialization with pickle", Severity.HIGH),
-        r"yaml\.load\s*\([^)]*\)(?!.*Loader)": ("Unsafe YAML loading", Severity.HIGH),
-        r"__import__\s*\(": ("Dynamic import", Severity.MEDIUM),
-        r"input\s*\(": ("User input without validation", Severity.LOW),
-        r"password\s*=\s*[\"'][^\"']+[\"']": ("Hardcoded password", Severity.CRITICAL),
-        r"api_key\s*=\s*[\"'][^\"']+[\"']": ("Hardcoded API key", Severity.CRITICAL),
-        r"secret\s*=\s*[\"'][^\"']+[\"']": ("Hardcoded secret", Severity.CRITICAL),
+        r"yaml\.load[ \t]*\([^)\n]*\)(?!.*Loader)": ("Unsafe YAML loading", Severity.HIGH),
+        r"__import__[ \t]*\(": ("Dynamic import", Severity.MEDIUM),
+        r"input[ \t]*\(": ("User input without validation", Severity.LOW),
+        r"password[ \t]*=[ \t]*[\"'][^\"'\n]+[\"']": ("Hardcoded password", Severity.CRITICAL),
+        r"api_key[ \t]*=[ \t]*[\"'][^\"'\n]+[\"']": ("Hardcoded API key", Severity.CRITICAL),
+        r"secret[ \t]*=[ \t]*[\"'][^\"'\n]+[\"']": ("Hardcoded secret", Severity.CRITICAL),
     },
     "javascript": {
-        r"eval\s*\(": ("Use of eval()", Severity.CRITICAL),
-        r"innerHTML\s*=": ("XSS vulnerability via innerHTML", Severity.HIGH),
-        r"document\.write\s*\(": ("Use of document.write()", Severity.MEDIUM),
-        r"\$\(.*\)\.html\s*\(": ("Potential XSS in jQuery", Severity.HIGH),
+        r"eval[ \t]*\(": ("Use of eval()", Severity.CRITICAL),
+        r"innerHTML[ \t]*=": ("XSS vulnerability via innerHTML", Severity.HIGH),
+        r"document\.write[ \t]*\(": ("Use of document.write()", Severity.MEDIUM),
+        r"\$\(.*\)\.html[ \t]*\(": ("Potential XSS in jQuery", Severity.HIGH),
     }
 }
 
+def _compile_security_patterns(patterns: Dict[str, Tuple[str, Severity]]
+                               ) -> Tuple[re.Pattern, re.Pattern, List[Tuple[str, Severity]]]:
+    """Union all patterns of a language into a single regex.
+
+    Every alternative is wrapped in a lookahead so overlapping findings
+    (e.g. ``eval(input())``) are still reported, just like scanning each
+    pattern on its own.
+
+    Returns a lower-cased union meant to run on ``code.lower()`` (cheaper
+    than case-insensitive matching) and a case-insensitive union for text
+    whose length changes when lower-cased.
+    """
+    def union(pats):
+        return "|".join(f"(?=(?P<g{i}>{p}))" for i, p in enumerate(pats))
+    
+    return (re.compile(union(p.lower() for p in patterns)),
+            re.compile(union(patterns), re.IGNORECASE),
+            list(patterns.values()))
+
+COMPILED_SECURITY = {
+    lang: _compile_security_patterns(patterns)
+    for lang, patterns in SECURITY_PATTERNS.items()
+}
+
+# Individual patterns, used to confirm Hyperscan candidates on their line
+SECURITY_REGEXES = {
+    lang: [re.compile(p, re.IGNORECASE) for p in patterns]
+    for lang, patterns in SECURITY_PATTERNS.items()
+}
+
+def _compile_hyperscan_database(patterns: Dict[str, Tuple[str, Severity]]) -> 'hyperscan.Database':
+    """Compile all patterns of a language into one Hyperscan database
+
+    Prefilter mode lets Hyperscan accept constructs it does not support
+    natively (e.g. lookaheads); it may then over-report, so every candidate
+    is confirmed with the Python regex.
+    """
+    db = hyperscan.Database()
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_PREFILTER
+    db.compile(
+        expressions=[p.encode() for p in patterns],
+        ids=list(range(len(patterns))),
+        elements=len(patterns),
+        flags=[flags] * len(patterns)
+    )
+    return db
+
+# Database and prototype scratch per language. A scratch may only be used by
+# one scan at a time, so every thread scans with its own clone.
+HYPERSCAN_SECURITY: Dict[str, Tuple[Any, Any]] = {}
+if HYPERSCAN_AVAILABLE:
+    try:
+        HYPERSCAN_SECURITY = {
+            lang: (db, hyperscan.Scratch(db))
+            for lang, db in ((lang, _compile_hyperscan_database(patterns))
+                             for lang, patterns in SECURITY_PATTERNS.items())
+        }
+    except hyperscan.error as e:
+        print(f"Failed to compile Hyperscan databases, using re: {e}")
+
+_hyperscan_local = threading.local()
+
+def _hyperscan_scratch(lang: str) -> 'hyperscan.Scratch':
+    """This thread's scratch space for the language's database"""
+    scratches = getattr(_hyperscan_local, 'scratches', None)
+    if scratches is None:
+        scratches = _hyperscan_local.scratches = {}
+    scratch = scratches.get(lang)
+    if scratch is None:
+        scratch = scratches[lang] = HYPERSCAN_SECURITY[lang][1].clone()
+    return scratch
+
+# Halstead approximation used by the maintainability index
+HALSTEAD_OPERATORS = "+-*/=<>!&|^~%"
+OPERAND_PATTERN = re.compile(r'\b\w+\b')
+
+# Style rules, in the order they are reported for a line
+STYLE_LINE_TOO_LONG, STYLE_TRAILING_WHITESPACE, STYLE_IMPORT_NOT_AT_TOP, STYLE_MULTIPLE_STATEMENTS = range(4)
+
+# Fixed style messages are shared by every issue that reports them
+MSG_TRAILING_WHITESPACE = sys.intern("Trailing whitespace")
+MSG_IMPORT_NOT_AT_TOP = sys.intern("Import not at top of file")
+MSG_MULTIPLE_STATEMENTS = sys.intern("Multiple statements on one line")
+SUGGEST_BREAK_LINE = sys.intern("Break line into multiple lines")
+SUGGEST_MOVE_IMPORTS = sys.intern("Move imports to the top of the file")
+SUGGEST_SPLIT_STATEMENTS = sys.intern("Split into separate lines")
+
 # ============================================================
 # DATA CLASSES
 # ============================================================
 
-@dataclass
+# Results are allocated per finding; slots drop the per-instance __dict__ (Python 3.10+)
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**DATACLASS_SLOTS)
 class CodeIssue:
     """Represents a single code issue"""
     message: str
@@ -124,19 +266,20 @@ class CodeIssue:
     code_snippet: Optional[str] = None
     
     def to_dict(self) -> Dict:
+        severity, severity_class, icon = SEVERITY_INFO[self.severity]
         return {
             "message": self.message,
-            "severity": self.severity.value,
-            "severity_class": SEVERITY_CSS[self.severity],
-            "category": self.category.value,
+            "severity": severity,
+            "severity_class": severity_class,
+            "category": CATEGORY_VALUES[self.category],
             "line_number": self.line_number,
             "column": self.column,
             "suggestion": self.suggestion,
             "code_snippet": self.code_snippet,
-            "icon": SEVERITY_COLORS[self.severity]
+            "icon": icon
         }
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class CodeMetrics:
     """Code quality metrics"""
     lines_of_code: int = 0
@@ -180,7 +323,7 @@ class CodeMetrics:
         else:
             return "F"
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ReviewResult:
     """Complete code review result"""
     code_hash: str
@@ -192,32 +335,33 @@ class ReviewResult:
     execution_time: float = 0.0
     
     def to_dict(self) -> Dict:
-        summary = self.get_summary()
+        metrics = self.metrics.to_dict()
+        summary = self.get_summary(metrics["grade"])
         return {
             "code_hash": self.code_hash,
             "language": self.language.value,
             "timestamp": self.timestamp,
             "issues": [i.to_dict() for i in self.issues],
-            "metrics": self.metrics.to_dict(),
+            "metrics": metrics,
             "ai_suggestions": self.ai_suggestions,
             "execution_time": round(self.execution_time, 3),
             "summary": summary
         }
     
-    def get_summary(self) -> Dict:
-        """Get summary statistics"""
-        severity_counts = {s.value: 0 for s in Severity}
-        category_counts = {c.value: 0 for c in IssueCategory}
+    def get_summary(self, quality_grade: Optional[str] = None) -> Dict:
+        """Get summary statistics, reusing an already computed grade if given"""
+        severity_counts = dict.fromkeys(Severity, 0)
+        category_counts = dict.fromkeys(IssueCategory, 0)
         
         for issue in self.issues:
-            severity_counts[issue.severity.value] += 1
-            category_counts[issue.category.value] += 1
+            severity_counts[issue.severity] += 1
+            category_counts[issue.category] += 1
         
         return {
             "total_issues": len(self.issues),
-            "by_severity": severity_counts,
-            "by_category": category_counts,
-            "quality_grade": self.metrics.get_grade(),
+            "by_severity": {SEVERITY_INFO[s][0]: n for s, n in severity_counts.items()},
+            "by_category": {CATEGORY_VALUES[c]: n for c, n in category_counts.items()},
+            "quality_grade": quality_grade or self.metrics.get_grade(),
             "risk_level": self._calculate_risk_level()
         }
     
@@ -279,15 +423,42 @@ class LanguageDetector:
         ]
     }
     
+    # Compiled once at class creation so detect() skips the re cache lookups
+    _COMPILED = [
+        (lang, [re.compile(p, re.MULTILINE) for p in patterns])
+        for lang, patterns in PATTERNS.items()
+    ]
+    
+    # Recent detections keyed by code hash, so the code itself is not retained
+    CACHE_SIZE = 128
+    _cache: 'OrderedDict[bytes, Language]' = OrderedDict()
+    _cache_lock = threading.Lock()
+    
     @classmethod
     def detect(cls, code: str) -> Language:
         """Detect the programming language of the code"""
+        code_key = CodeUtils.cache_key(code)
+        with cls._cache_lock:
+            language = cls._cache.get(code_key)
+            if language is not None:
+                cls._cache.move_to_end(code_key)
+                return language
+        
+        language = cls._detect(code)
+        
+        with cls._cache_lock:
+            cls._cache[code_key] = language
+            if len(cls._cache) > cls.CACHE_SIZE:
+                cls._cache.popitem(last=False)
+        return language
+    
+    @classmethod
+    def _detect(cls, code: str) -> Language:
+        """Score every language by how many of its patterns occur"""
         scores = {lang: 0 for lang in Language}
         
-        for lang, patterns in cls.PATTERNS.items():
-            for pattern in patterns:
-                if re.search(pattern, code, re.MULTILINE):
-                    scores[lang] += 1
+        for lang, patterns in cls._COMPILED:
+            scores[lang] = sum(1 for rx in patterns if rx.search(code))
         
         best_lang = max(scores, key=scores.get)
         if scores[best_lang] > 0:
@@ -298,23 +469,271 @@ class LanguageDetector:
 # CODE UTILITIES
 # ============================================================
 
+@dataclass
+class LineIndex:
+    """Lines of the code and the offset each one starts at, built once per review"""
+    lines: List[str]
+    offsets: List[int]
+    data: bytes = b''
+    _byte_offsets: Optional[List[int]] = field(default=None, init=False, repr=False, compare=False)
+    
+    @classmethod
+    def from_code(cls, code: str, data: Optional[bytes] = None) -> 'LineIndex':
+        """Build the index; ``data`` is the UTF-8 encoding if already computed"""
+        lines = code.split('\n')
+        offsets = [0]
+        offsets.extend(accumulate(len(line) + 1 for line in lines[:-1]))
+        if data is None:
+            data = code.encode('utf-8')
+        return cls(lines=lines, offsets=offsets, data=data)
+    
+    def line_index(self, offset: int) -> int:
+        """Zero-based index of the line containing a character offset"""
+        return bisect.bisect_right(self.offsets, offset) - 1
+    
+    def line_index_for_byte(self, offset: int) -> int:
+        """Zero-based index of the line containing a byte offset into ``data``"""
+        if self._byte_offsets is None:
+            if len(self.data) == self.offsets[-1] + len(self.lines[-1]):
+                # Pure ASCII: byte and character offsets coincide
+                self._byte_offsets = self.offsets
+            else:
+                self._byte_offsets = [0]
+                self._byte_offsets.extend(
+                    accumulate(len(line.encode('utf-8')) + 1 for line in self.lines[:-1])
+                )
+        return bisect.bisect_right(self._byte_offsets, offset) - 1
+
+@lru_cache(maxsize=1)
+def _format_second(seconds: int) -> str:
+    """Local ISO 8601 date-time for a whole second; reused within that second"""
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(seconds))
+
 class CodeUtils:
     """Utility functions for code analysis"""
     
     @staticmethod
-    def compute_hash(code: str) -> str:
-        """Compute a hash of the code for identification"""
-        return hashlib.md5(code.encode()).hexdigest()[:12]
+    def compute_hash(code: Union[str, bytes]) -> str:
+        """Compute a hash of the code for identification (not for security)"""
+        if isinstance(code, str):
+            code = code.encode('utf-8')
+        return hashlib.blake2b(code, digest_size=6).hexdigest()
+    
+    @staticmethod
+    def cache_key(code: Union[str, bytes]) -> bytes:
+        """Digest identifying code in process-wide caches (too long to collide)"""
+        if isinstance(code, str):
+            code = code.encode('utf-8')
+        return hashlib.blake2b(code, digest_size=16).digest()
     
     @staticmethod
-    def count_lines(code: str) -> Tuple[int, int, int]:
+    def timestamp() -> str:
+        """Current local time in ISO 8601 format with microseconds"""
+        now = time.time()
+        seconds = int(now)
+        return f"{_format_second(seconds)}.{int((now - seconds) * 1e6):06d}"
+    
+    @staticmethod
+    def parse_python(code: str) -> ast.Module:
+        """Parse Python source into an AST (same result as ast.parse)"""
+        return compile(code, '<unknown>', 'exec', ast.PyCF_ONLY_AST)
+    
+    @staticmethod
+    def count_lines(code: str, line_index: Optional[LineIndex] = None) -> Tuple[int, int, int]:
         """Count total, blank, and comment lines"""
-        lines = code.split('\n')
+        lines = (line_index or LineIndex.from_code(code)).lines
         total = len(lines)
-        blank = sum(1 for line in lines if not line.strip())
-        comment = sum(1 for line in lines if line.strip().startswith('#') or line.strip().startswith('//'))
+        # One lstrip per line, then C-level counting instead of generator loops
+        heads = list(map(str.lstrip, lines))
+        blank = heads.count('')
+        comment = sum(map(methodcaller('startswith', ('#', '//')), heads))
         return total, blank, comment
 
+# ============================================================
+# PYTHON AST ANALYSIS
+# ============================================================
+
+class UnifiedPythonAnalyzer(ast.NodeVisitor):
+    """Single-pass AST visitor collecting everything the Python checks need
+    
+    Structure, complexity, documentation and best-practice findings are all
+    gathered in one traversal so a review parses and walks the tree once.
+    """
+    
+    NESTING_NODES = frozenset((ast.If, ast.While, ast.For, ast.With, ast.Try))
+    
+    def __init__(self):
+        self.tree: Optional[ast.Module] = None
+        self.syntax_error: Optional[Exception] = None
+        self.functions: List[Dict] = []
+        self.classes: List[Dict] = []
+        self.imports: List[str] = []
+        self.cyclomatic = 1
+        self.cognitive = 0
+        self.max_nesting = 0
+        self.documentation_issues: List[CodeIssue] = []
+        self.best_practice_issues: List[CodeIssue] = []
+        self._depth = 0
+    
+    @classmethod
+    def from_code(cls, code: str, tree: Optional[ast.Module] = None) -> 'UnifiedPythonAnalyzer':
+        """Parse and analyze code, recording a syntax error instead of raising
+        
+        Pass ``tree`` when the code has already been parsed. The tree is kept
+        on the analyzer so later consumers can reuse it instead of re-parsing.
+        """
+        analyzer = cls()
+        if tree is None:
+            try:
+                tree = CodeUtils.parse_python(code)
+            except (SyntaxError, ValueError) as e:
+                analyzer.syntax_error = e
+                analyzer.cyclomatic = 0
+                return analyzer
+        analyzer.tree = tree
+        analyzer.visit(tree)
+        return analyzer
+    
+    @property
+    def valid(self) -> bool:
+        return self.syntax_error is None
+    
+    @staticmethod
+    def _has_docstring(node: ast.AST) -> bool:
+        return bool(node.body and
+                    isinstance(node.body[0], ast.Expr) and
+                    isinstance(node.body[0].value, ast.Constant) and
+                    isinstance(node.body[0].value.value, str))
+    
+    def visit(self, node: ast.AST):
+        """Walk the tree with an explicit stack instead of recursion
+        
+        Handlers only inspect their own node; the loop takes care of
+        children and nesting depth, so deeply nested code cannot hit the
+        recursion limit.
+        """
+        stack = deque([(node, 0)])
+        while stack:
+            node, depth = stack.pop()
+            self._depth = depth
+            node_type = type(node)
+            handler = self.HANDLERS.get(node_type)
+            if handler is not None:
+                handler(self, node)
+            
+            if node_type in self.NESTING_NODES:
+                depth += 1
+                if depth > self.max_nesting:
+                    self.max_nesting = depth
+            
+            # Reversed so nodes pop in source order
+            stack.extend((child, depth) for child in reversed(list(ast.iter_child_nodes(node))))
+    
+    def _visit_branch(self, node: ast.AST):
+        self.cyclomatic += 1
+        self.cognitive += 1 + self._depth
+    
+    visit_If = _visit_branch
+    visit_While = _visit_branch
+    visit_For = _visit_branch
+    
+    def visit_ExceptHandler(self, node: ast.ExceptHandler):
+        if node.type is None:
+            self.best_practice_issues.append(CodeIssue(
+                message="Bare 'except:' clause",
+                severity=Severity.MEDIUM,
+                category=IssueCategory.BEST_PRACTICE,
+                line_number=node.lineno,
+                suggestion="Specify exception type, e.g., 'except Exception:'"
+            ))
+        self._visit_branch(node)
+    
+    def visit_BoolOp(self, node: ast.BoolOp):
+        self.cyclomatic += len(node.values) - 1
+        self.cognitive += len(node.values) - 1
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        has_docstring = self._has_docstring(node)
+        self.functions.append({
+            'name': node.name,
+            'line': node.lineno,
+            'args_count': len(node.args.args),
+            'has_docstring': has_docstring
+        })
+        
+        if not has_docstring and not node.name.startswith('_'):
+            self.documentation_issues.append(CodeIssue(
+                message=f"Function '{node.name}' missing docstring",
+                severity=Severity.LOW,
+                category=IssueCategory.DOCUMENTATION,
+                line_number=node.lineno,
+                suggestion="Add a docstring describing the function's purpose"
+            ))
+        
+        for default in node.args.defaults:
+            if isinstance(default, (ast.List, ast.Dict, ast.Set)):
+                self.best_practice_issues.append(CodeIssue(
+                    message=f"Mutable default argument in '{node.name}'",
+                    severity=Severity.MEDIUM,
+                    category=IssueCategory.BEST_PRACTICE,
+                    line_number=node.lineno,
+                    suggestion="Use None as default and initialize inside function"
+                ))
+    
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self.classes.append({
+            'name': node.name,
+            'line': node.lineno,
+            'methods_count': sum(1 for n in node.body if isinstance(n, ast.FunctionDef))
+        })
+        
+        if not self._has_docstring(node):
+            self.documentation_issues.append(CodeIssue(
+                message=f"Class '{node.name}' missing docstring",
+                severity=Severity.LOW,
+                category=IssueCategory.DOCUMENTATION,
+                line_number=node.lineno,
+                suggestion="Add a docstring describing the class"
+            ))
+    
+    def visit_Import(self, node: ast.Import):
+        self.imports.extend([alias.name for alias in node.names])
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        self.imports.append(f"{node.module}.{', '.join(alias.name for alias in node.names)}")
+        
+        if any(alias.name == '*' for alias in node.names):
+            self.best_practice_issues.append(CodeIssue(
+                message=f"Star import from '{node.module}'",
+                severity=Severity.MEDIUM,
+                category=IssueCategory.BEST_PRACTICE,
+                line_number=node.lineno,
+                suggestion="Import specific names instead of using *"
+            ))
+    
+    def visit_Global(self, node: ast.Global):
+        self.best_practice_issues.append(CodeIssue(
+            message=f"Use of 'global' statement",
+            severity=Severity.LOW,
+            category=IssueCategory.BEST_PRACTICE,
+            line_number=node.lineno,
+            suggestion="Consider passing values as parameters instead"
+        ))
+    
+    # Node type -> handler, looked up once per node instead of by method name
+    HANDLERS = {
+        ast.If: _visit_branch,
+        ast.While: _visit_branch,
+        ast.For: _visit_branch,
+        ast.ExceptHandler: visit_ExceptHandler,
+        ast.BoolOp: visit_BoolOp,
+        ast.FunctionDef: visit_FunctionDef,
+        ast.ClassDef: visit_ClassDef,
+        ast.Import: visit_Import,
+        ast.ImportFrom: visit_ImportFrom,
+        ast.Global: visit_Global,
+    }
+
 # ============================================================
 # CODE ANALYSIS TOOLS
 # ============================================================
@@ -323,99 +742,55 @@ class CodeAnalysisTools:
     """Comprehensive code analysis tools"""
     
     @staticmethod
-    def analyze_ast(code: str) -> Dict:
+    def analyze_ast(code: str, analysis: Optional[UnifiedPythonAnalyzer] = None) -> Dict:
         """Analyze code using AST"""
-        try:
-            tree = ast.parse(code)
-            
-            functions = []
-            classes = []
-            imports = []
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    functions.append({
-                        'name': node.name,
-                        'line': node.lineno,
-                        'args_count': len(node.args.args),
-                        'has_docstring': (isinstance(node.body[0], ast.Expr) and 
-                                         isinstance(node.body[0].value, ast.Constant) and
-                                         isinstance(node.body[0].value.value, str)) if node.body else False
-                    })
-                elif isinstance(node, ast.ClassDef):
-                    classes.append({
-                        'name': node.name,
-                        'line': node.lineno,
-                        'methods_count': sum(1 for n in node.body if isinstance(n, ast.FunctionDef))
-                    })
-                elif isinstance(node, ast.Import):
-                    imports.extend([alias.name for alias in node.names])
-                elif isinstance(node, ast.ImportFrom):
-                    imports.append(f"{node.module}.{', '.join(alias.name for alias in node.names)}")
-            
-            return {
-                'valid': True,
-                'functions': functions,
-                'classes': classes,
-                'imports': imports
-            }
-        except SyntaxError as e:
+        if analysis is None:
+            analysis = UnifiedPythonAnalyzer.from_code(code)
+        
+        if not analysis.valid:
+            e = analysis.syntax_error
             return {
                 'valid': False,
                 'error': str(e),
-                'line': e.lineno,
-                'offset': e.offset
+                'line': getattr(e, 'lineno', None),
+                'offset': getattr(e, 'offset', None)
             }
+        
+        return {
+            'valid': True,
+            'functions': analysis.functions,
+            'classes': analysis.classes,
+            'imports': analysis.imports
+        }
     
     @staticmethod
-    def calculate_complexity(code: str) -> Dict:
+    def calculate_complexity(code: str, analysis: Optional[UnifiedPythonAnalyzer] = None) -> Dict:
         """Calculate cyclomatic and cognitive complexity"""
-        try:
-            tree = ast.parse(code)
-            
-            cyclomatic = 1
-            cognitive = 0
-            max_nesting = 0
-            
-            def analyze_node(node, depth=0):
-                nonlocal cyclomatic, cognitive, max_nesting
-                
-                if isinstance(node, (ast.If, ast.While, ast.For, ast.ExceptHandler)):
-                    cyclomatic += 1
-                    cognitive += 1 + depth
-                elif isinstance(node, ast.BoolOp):
-                    cyclomatic += len(node.values) - 1
-                    cognitive += len(node.values) - 1
-                
-                new_depth = depth
-                if isinstance(node, (ast.If, ast.While, ast.For, ast.With, ast.Try)):
-                    new_depth = depth + 1
-                    max_nesting = max(max_nesting, new_depth)
-                
-                for child in ast.iter_child_nodes(node):
-                    analyze_node(child, new_depth)
-            
-            analyze_node(tree)
-            
-            return {
-                'cyclomatic': cyclomatic,
-                'cognitive': cognitive,
-                'max_nesting': max_nesting
-            }
-        except:
+        if analysis is None:
+            analysis = UnifiedPythonAnalyzer.from_code(code)
+        
+        if not analysis.valid:
             return {'cyclomatic': 0, 'cognitive': 0, 'max_nesting': 0}
+        
+        return {
+            'cyclomatic': analysis.cyclomatic,
+            'cognitive': analysis.cognitive,
+            'max_nesting': analysis.max_nesting
+        }
     
     @staticmethod
-    def calculate_maintainability_index(code: str, complexity: int) -> float:
+    def calculate_maintainability_index(code: str, complexity: int,
+                                        line_index: Optional[LineIndex] = None) -> float:
         """Calculate maintainability index (0-100)"""
-        lines = code.split('\n')
-        loc = len([l for l in lines if l.strip() and not l.strip().startswith('#')])
+        lines = (line_index or LineIndex.from_code(code)).lines
+        loc = sum(1 for stripped in map(str.strip, lines) if stripped and not stripped.startswith('#'))
         
         if loc == 0:
             return 100.0
         
-        operators = len(re.findall(r'[+\-*/=<>!&|^~%]', code))
-        operands = len(re.findall(r'\b\w+\b', code))
+        # One C-level str.count per operator instead of collecting every match
+        operators = sum(code.count(op) for op in HALSTEAD_OPERATORS)
+        operands = len(OPERAND_PATTERN.findall(code))
         volume = (operators + operands) * (1 + (operators + operands) / 10) if operators + operands > 0 else 1
         
         mi = 171 - 5.2 * (volume ** 0.23) - 0.23 * complexity - 16.2 * (loc ** 0.25)
@@ -423,169 +798,148 @@ class CodeAnalysisTools:
         return max(0, min(100, mi))
     
     @staticmethod
-    def check_security(code: str, language: Language = Language.PYTHON) -> List[CodeIssue]:
+    def check_security(code: str, language: Language = Language.PYTHON,
+                       line_index: Optional[LineIndex] = None) -> List[CodeIssue]:
         """Check for security vulnerabilities"""
         issues = []
-        lang_key = language.value if language.value in SECURITY_PATTERNS else "python"
-        patterns = SECURITY_PATTERNS.get(lang_key, {})
+        lang_key = language.value if language.value in COMPILED_SECURITY else "python"
+        lower_union, icase_union, findings = COMPILED_SECURITY[lang_key]
         
-        lines = code.split('\n')
-        for i, line in enumerate(lines, 1):
-            for pattern, (message, severity) in patterns.items():
-                if re.search(pattern, line, re.IGNORECASE):
-                    issues.append(CodeIssue(
-                        message=message,
-                        severity=severity,
-                        category=IssueCategory.SECURITY,
-                        line_number=i,
-                        code_snippet=line.strip()[:50]
-                    ))
+        if line_index is None:
+            line_index = LineIndex.from_code(code)
+        
+        # A pattern is reported at most once per line
+        if lang_key in HYPERSCAN_SECURITY:
+            hits = CodeAnalysisTools._scan_security_hyperscan(code, lang_key, line_index)
+        else:
+            # Offsets into the lower-cased copy are only valid if no character
+            # changed length when lower-cased (e.g. 'İ')
+            code_lc = code.lower()
+            if len(code_lc) == len(code):
+                matches = lower_union.finditer(code_lc)
+            else:
+                matches = icase_union.finditer(code)
+            
+            hits = set()
+            for m in matches:
+                hits.add((line_index.line_index(m.start()), int(m.lastgroup[1:])))
+        
+        for line_idx, pattern_idx in sorted(hits):
+            message, severity = findings[pattern_idx]
+            issues.append(CodeIssue(
+                message=message,
+                severity=severity,
+                category=IssueCategory.SECURITY,
+                line_number=line_idx + 1,
+                code_snippet=line_index.lines[line_idx].strip()[:50]
+            ))
         
         return issues
     
     @staticmethod
-    def check_style(code: str, max_line_length: int = 88) -> List[CodeIssue]:
+    def _scan_security_hyperscan(code: str, lang_key: str,
+                                 line_index: LineIndex) -> Set[Tuple[int, int]]:
+        """Find (line index, pattern index) pairs with a single Hyperscan pass"""
+        db = HYPERSCAN_SECURITY[lang_key][0]
+        candidates = set()
+        
+        # Hyperscan reports byte offsets; the match ends on its own line
+        def on_match(pattern_id, start, end, flags, context):
+            candidates.add((line_index.line_index_for_byte(end - 1), pattern_id))
+        
+        db.scan(line_index.data, match_event_handler=on_match, scratch=_hyperscan_scratch(lang_key))
+        
+        regexes = SECURITY_REGEXES[lang_key]
+        return {(line_idx, pattern_idx) for line_idx, pattern_idx in candidates
+                if regexes[pattern_idx].search(line_index.lines[line_idx])}
+    
+    @staticmethod
+    def check_style(code: str, max_line_length: int = 88,
+                    line_index: Optional[LineIndex] = None) -> List[CodeIssue]:
         """Check code style issues"""
         issues = []
-        lines = code.split('\n')
+        if line_index is None:
+            line_index = LineIndex.from_code(code)
+        lines = line_index.lines
         
-        import_section_ended = False
+        # Each rule is a tight prefilter over all lines; CodeIssue objects are
+        # only built for the lines that were flagged.
+        findings = [(i, STYLE_LINE_TOO_LONG)
+                    for i, length in enumerate(map(len, lines)) if length > max_line_length]
+        findings.extend((i, STYLE_TRAILING_WHITESPACE)
+                        for i, line in enumerate(lines) if line.endswith((' ', '\t')))
         
-        for i, line in enumerate(lines, 1):
-            if len(line) > max_line_length:
+        # Imports count as misplaced once a line of real code has been seen
+        first_code_line = next(
+            (i for i, stripped in enumerate(map(str.strip, lines))
+             if stripped and not stripped.startswith(('#', 'import', 'from'))),
+            len(lines)
+        )
+        findings.extend((i, STYLE_IMPORT_NOT_AT_TOP)
+                        for i in range(first_code_line + 1, len(lines))
+                        if ('import ' in lines[i] or 'from ' in lines[i])
+                        and lines[i].strip().startswith(('import ', 'from ')))
+        
+        findings.extend((i, STYLE_MULTIPLE_STATEMENTS)
+                        for i, line in enumerate(lines)
+                        if ';' in line and not line.strip().startswith('#'))
+        
+        # Long lines of equal length share one message string
+        long_line_messages: Dict[int, str] = {}
+        
+        for line_idx, rule in sorted(findings):
+            i = line_idx + 1
+            if rule == STYLE_LINE_TOO_LONG:
+                length = len(lines[line_idx])
+                message = long_line_messages.get(length)
+                if message is None:
+                    message = long_line_messages[length] = f"Line too long ({length} > {max_line_length})"
                 issues.append(CodeIssue(
-                    message=f"Line too long ({len(line)} > {max_line_length})",
+                    message=message,
                     severity=Severity.LOW,
                     category=IssueCategory.STYLE,
                     line_number=i,
-                    suggestion=f"Break line into multiple lines"
+                    suggestion=SUGGEST_BREAK_LINE
                 ))
-            
-            if line.endswith(' ') or line.endswith('\t'):
+            elif rule == STYLE_TRAILING_WHITESPACE:
                 issues.append(CodeIssue(
-                    message="Trailing whitespace",
+                    message=MSG_TRAILING_WHITESPACE,
                     severity=Severity.INFO,
                     category=IssueCategory.STYLE,
                     line_number=i
                 ))
-            
-            stripped = line.strip()
-            if stripped and not stripped.startswith('#') and not stripped.startswith('import') and not stripped.startswith('from'):
-                import_section_ended = True
-            
-            if import_section_ended and (stripped.startswith('import ') or stripped.startswith('from ')):
+            elif rule == STYLE_IMPORT_NOT_AT_TOP:
                 issues.append(CodeIssue(
-                    message="Import not at top of file",
+                    message=MSG_IMPORT_NOT_AT_TOP,
                     severity=Severity.LOW,
                     category=IssueCategory.STYLE,
                     line_number=i,
-                    suggestion="Move imports to the top of the file"
+                    suggestion=SUGGEST_MOVE_IMPORTS
                 ))
-            
-            if ';' in line and not line.strip().startswith('#'):
+            else:
                 issues.append(CodeIssue(
-                    message="Multiple statements on one line",
+                    message=MSG_MULTIPLE_STATEMENTS,
                     severity=Severity.LOW,
                     category=IssueCategory.STYLE,
                     line_number=i,
-                    suggestion="Split into separate lines"
+                    suggestion=SUGGEST_SPLIT_STATEMENTS
                 ))
         
         return issues
     
     @staticmethod
-    def check_documentation(code: str) -> List[CodeIssue]:
+    def check_documentation(code: str, analysis: Optional[UnifiedPythonAnalyzer] = None) -> List[CodeIssue]:
         """Check documentation issues"""
-        issues = []
-        
-        try:
-            tree = ast.parse(code)
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    has_docstring = (node.body and 
-                                    isinstance(node.body[0], ast.Expr) and
-                                    isinstance(node.body[0].value, ast.Constant) and
-                                    isinstance(node.body[0].value.value, str))
-                    
-                    if not has_docstring and not node.name.startswith('_'):
-                        issues.append(CodeIssue(
-                            message=f"Function '{node.name}' missing docstring",
-                            severity=Severity.LOW,
-                            category=IssueCategory.DOCUMENTATION,
-                            line_number=node.lineno,
-                            suggestion="Add a docstring describing the function's purpose"
-                        ))
-                
-                elif isinstance(node, ast.ClassDef):
-                    has_docstring = (node.body and 
-                                    isinstance(node.body[0], ast.Expr) and
-                                    isinstance(node.body[0].value, ast.Constant) and
-                                    isinstance(node.body[0].value.value, str))
-                    
-                    if not has_docstring:
-                        issues.append(CodeIssue(
-                            message=f"Class '{node.name}' missing docstring",
-                            severity=Severity.LOW,
-                            category=IssueCategory.DOCUMENTATION,
-                            line_number=node.lineno,
-                            suggestion="Add a docstring describing the class"
-                        ))
-        except SyntaxError:
-            pass
-        
-        return issues
+        if analysis is None:
+            analysis = UnifiedPythonAnalyzer.from_code(code)
+        return list(analysis.documentation_issues)
     
     @staticmethod
-    def check_best_practices(code: str) -> List[CodeIssue]:
+    def check_best_practices(code: str, analysis: Optional[UnifiedPythonAnalyzer] = None) -> List[CodeIssue]:
         """Check for best practice violations"""
-        issues = []
-        
-        try:
-            tree = ast.parse(code)
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ExceptHandler) and node.type is None:
-                    issues.append(CodeIssue(
-                        message="Bare 'except:' clause",
-                        severity=Severity.MEDIUM,
-                        category=IssueCategory.BEST_PRACTICE,
-                        line_number=node.lineno,
-                        suggestion="Specify exception type, e.g., 'except Exception:'"
-                    ))
-                
-                if isinstance(node, ast.FunctionDef):
-                    for default in node.args.defaults:
-                        if isinstance(default, (ast.List, ast.Dict, ast.Set)):
-                            issues.append(CodeIssue(
-                                message=f"Mutable default argument in '{node.name}'",
-                                severity=Severity.MEDIUM,
-                                category=IssueCategory.BEST_PRACTICE,
-                                line_number=node.lineno,
-                                suggestion="Use None as default and initialize inside function"
-                            ))
-                
-                if isinstance(node, ast.Global):
-                    issues.append(CodeIssue(
-                        message=f"Use of 'global' statement",
-                        severity=Severity.LOW,
-                        category=IssueCategory.BEST_PRACTICE,
-                        line_number=node.lineno,
-                        suggestion="Consider passing values as parameters instead"
-                    ))
-                
-                if isinstance(node, ast.ImportFrom) and any(alias.name == '*' for alias in node.names):
-                    issues.append(CodeIssue(
-                        message=f"Star import from '{node.module}'",
-                        severity=Severity.MEDIUM,
-                        category=IssueCategory.BEST_PRACTICE,
-                        line_number=node.lineno,
-                        suggestion="Import specific names instead of using *"
-                    ))
-        except SyntaxError:
-            pass
-        
-        return issues
+        if analysis is None:
+            analysis = UnifiedPythonAnalyzer.from_code(code)
+        return list(analysis.best_practice_issues)
 
 # ============================================================
 # AGENTS
@@ -598,8 +952,15 @@ class BaseAgent(ABC):
         self.name = name
     
     @abstractmethod
-    def analyze(self, code: str, language: Language) -> List[CodeIssue]:
-        """Analyze code and return issues"""
+    def analyze(self, code: str, language: Language,
+                analysis: Optional[UnifiedPythonAnalyzer] = None,
+                line_index: Optional[LineIndex] = None) -> List[CodeIssue]:
+        """Analyze code and return issues
+        
+        ``analysis`` (the single-pass AST result for Python code) and
+        ``line_index`` are shared across agents by the orchestrator;
+        agents build their own when they are not supplied.
+        """
         pass
 
 class SyntaxAnalyzerAgent(BaseAgent):
@@ -609,11 +970,13 @@ class SyntaxAnalyzerAgent(BaseAgent):
         super().__init__("SyntaxAnalyzer")
         self.tools = CodeAnalysisTools()
     
-    def analyze(self, code: str, language: Language) -> List[CodeIssue]:
+    def analyze(self, code: str, language: Language,
+                analysis: Optional[UnifiedPythonAnalyzer] = None,
+                line_index: Optional[LineIndex] = None) -> List[CodeIssue]:
         issues = []
         
         if language == Language.PYTHON:
-            ast_result = self.tools.analyze_ast(code)
+            ast_result = self.tools.analyze_ast(code, analysis)
             
             if not ast_result.get('valid'):
                 issues.append(CodeIssue(
@@ -633,8 +996,10 @@ class SecurityAgent(BaseAgent):
         super().__init__("SecurityAgent")
         self.tools = CodeAnalysisTools()
     
-    def analyze(self, code: str, language: Language) -> List[CodeIssue]:
-        return self.tools.check_security(code, language)
+    def analyze(self, code: str, language: Language,
+                analysis: Optional[UnifiedPythonAnalyzer] = None,
+                line_index: Optional[LineIndex] = None) -> List[CodeIssue]:
+        return self.tools.check_security(code, language, line_index)
 
 class StyleAgent(BaseAgent):
     """Agent for code style checking"""
@@ -644,8 +1009,10 @@ class StyleAgent(BaseAgent):
         self.max_line_length = max_line_length
         self.tools = CodeAnalysisTools()
     
-    def analyze(self, code: str, language: Language) -> List[CodeIssue]:
-        return self.tools.check_style(code, self.max_line_length)
+    def analyze(self, code: str, language: Language,
+                analysis: Optional[UnifiedPythonAnalyzer] = None,
+                line_index: Optional[LineIndex] = None) -> List[CodeIssue]:
+        return self.tools.check_style(code, self.max_line_length, line_index)
 
 class ComplexityAgent(BaseAgent):
     """Agent for complexity analysis"""
@@ -655,11 +1022,13 @@ class ComplexityAgent(BaseAgent):
         self.max_complexity = max_complexity
         self.tools = CodeAnalysisTools()
     
-    def analyze(self, code: str, language: Language) -> List[CodeIssue]:
+    def analyze(self, code: str, language: Language,
+                analysis: Optional[UnifiedPythonAnalyzer] = None,
+                line_index: Optional[LineIndex] = None) -> List[CodeIssue]:
         issues = []
         
         if language == Language.PYTHON:
-            complexity = self.tools.calculate_complexity(code)
+            complexity = self.tools.calculate_complexity(code, analysis)
             
             if complexity['cyclomatic'] > self.max_complexity:
                 issues.append(CodeIssue(
@@ -686,9 +1055,11 @@ class DocumentationAgent(BaseAgent):
         super().__init__("DocumentationAgent")
         self.tools = CodeAnalysisTools()
     
-    def analyze(self, code: str, language: Language) -> List[CodeIssue]:
+    def analyze(self, code: str, language: Language,
+                analysis: Optional[UnifiedPythonAnalyzer] = None,
+                line_index: Optional[LineIndex] = None) -> List[CodeIssue]:
         if language == Language.PYTHON:
-            return self.tools.check_documentation(code)
+            return self.tools.check_documentation(code, analysis)
         return []
 
 class BestPracticesAgent(BaseAgent):
@@ -698,53 +1069,110 @@ class BestPracticesAgent(BaseAgent):
         super().__init__("BestPracticesAgent")
         self.tools = CodeAnalysisTools()
     
-    def analyze(self, code: str, language: Language) -> List[CodeIssue]:
+    def analyze(self, code: str, language: Language,
+                analysis: Optional[UnifiedPythonAnalyzer] = None,
+                line_index: Optional[LineIndex] = None) -> List[CodeIssue]:
         if language == Language.PYTHON:
-            return self.tools.check_best_practices(code)
+            return self.tools.check_best_practices(code, analysis)
         return []
 
 # ============================================================
 # ORCHESTRATOR
 # ============================================================
 
+# Agents of all orchestrators and concurrent requests fan out on one bounded
+# pool; its threads are started on first use (safe to fork before that)
+AGENT_POOL_SIZE = min(32, (os.cpu_count() or 1) + 4)
+AGENT_EXECUTOR = ThreadPoolExecutor(max_workers=AGENT_POOL_SIZE, thread_name_prefix="review-agent")
+
 class CodeReviewOrchestrator:
     """Orchestrates all agents for comprehensive code review"""
     
-    def __init__(self):
+    def __init__(self, cache_size: int = 256, executor: Optional[ThreadPoolExecutor] = None):
         self.tools = CodeAnalysisTools()
-        self.agents = [
-            SyntaxAnalyzerAgent(),
-            SecurityAgent(),
-            StyleAgent(),
-            ComplexityAgent(),
-            DocumentationAgent(),
-            BestPracticesAgent()
-        ]
+        syntax, security, style = SyntaxAnalyzerAgent(), SecurityAgent(), StyleAgent()
+        complexity, documentation, best_practices = ComplexityAgent(), DocumentationAgent(), BestPracticesAgent()
+        self.agents = [syntax, security, style, complexity, documentation, best_practices]
+        # Only Python has AST-backed checks; other languages skip those agents outright
+        self._agents_by_lang: Dict[Language, Tuple[BaseAgent, ...]] = {
+            Language.PYTHON: tuple(self.agents),
+        }
+        self._default_agents: Tuple[BaseAgent, ...] = (security, style)
+        # Agents are independent, so they run side by side on the shared pool
+        self._executor = executor or AGENT_EXECUTOR
+        # LRU of finished reviews keyed by (128-bit code digest, requested language)
+        self.cache_size = cache_size
+        self._review_cache: 'OrderedDict[Tuple[bytes, Optional[Language]], ReviewResult]' = OrderedDict()
+        # Requests are served from several threads at once
+        self._cache_lock = threading.Lock()
     
     def review_code(self, code: str, language: Language = None) -> ReviewResult:
-        """Perform comprehensive code review"""
+        """Perform comprehensive code review
+        
+        Repeated code is served from the review cache. Results share their
+        CodeIssue objects with the cache, so treat issues as read-only.
+        """
         start_time = time.time()
         
+        # Encoded once; shared by hashing and any byte-level scanning
+        code_bytes = code.encode('utf-8')
+        code_hash = CodeUtils.compute_hash(code_bytes)
+        # The short display hash is too easy to collide for a shared cache
+        cache_key = (CodeUtils.cache_key(code_bytes), language)
+        
+        with self._cache_lock:
+            cached = self._review_cache.get(cache_key)
+            if cached is not None:
+                self._review_cache.move_to_end(cache_key)
+        if cached is not None:
+            return self._copy_result(cached, timestamp=CodeUtils.timestamp(),
+                                     execution_time=time.time() - start_time)
+        
+        result = self._review(code, code_bytes, code_hash, language, start_time)
+        
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._review_cache[cache_key] = self._copy_result(result)
+                if len(self._review_cache) > self.cache_size:
+                    self._review_cache.popitem(last=False)
+        
+        return result
+    
+    @staticmethod
+    def _copy_result(result: ReviewResult, **changes) -> ReviewResult:
+        """Copy a result so its fields and containers can be changed independently
+        
+        Callers set e.g. ai_suggestions on results and metrics are plain
+        values, but issues are never modified once reported, so they are shared.
+        """
+        return replace(result, issues=list(result.issues), metrics=replace(result.metrics), **changes)
+    
+    def _review(self, code: str, code_bytes: bytes, code_hash: str,
+                language: Optional[Language], start_time: float) -> ReviewResult:
+        """Run every agent over the code"""
         if language is None:
             language = LanguageDetector.detect(code)
         
-        code_hash = CodeUtils.compute_hash(code)
+        # Split lines and parse/walk the tree once; every check reads from them
+        line_index = LineIndex.from_code(code, code_bytes)
+        analysis = None
+        if language == Language.PYTHON:
+            analysis = UnifiedPythonAnalyzer.from_code(code)
         
         all_issues: List[CodeIssue] = []
-        for agent in self.agents:
-            try:
-                issues = agent.analyze(code, language)
-                all_issues.extend(issues)
-            except Exception as e:
-                print(f"Error in {agent.name}: {e}")
+        for issues in self._executor.map(
+            lambda agent: self._run_agent(agent, code, language, analysis, line_index),
+            self._agents_by_lang.get(language, self._default_agents)
+        ):
+            all_issues.extend(issues)
         
-        metrics = self._calculate_metrics(code, language)
+        metrics = self._calculate_metrics(code, language, analysis, line_index)
         
         execution_time = time.time() - start_time
         result = ReviewResult(
             code_hash=code_hash,
             language=language,
-            timestamp=datetime.now().isoformat(),
+            timestamp=CodeUtils.timestamp(),
             issues=all_issues,
             metrics=metrics,
             execution_time=execution_time
@@ -752,9 +1180,24 @@ class CodeReviewOrchestrator:
         
         return result
     
-    def _calculate_metrics(self, code: str, language: Language) -> CodeMetrics:
+    @staticmethod
+    def _run_agent(agent: BaseAgent, code: str, language: Language,
+                   analysis: Optional[UnifiedPythonAnalyzer],
+                   line_index: LineIndex) -> List[CodeIssue]:
+        """Run a single agent, isolating its failures from the others"""
+        try:
+            return agent.analyze(code, language, analysis, line_index)
+        except Exception as e:
+            print(f"Error in {agent.name}: {e}")
+            return []
+    
+    def _calculate_metrics(self, code: str, language: Language,
+                           analysis: Optional[UnifiedPythonAnalyzer] = None,
+                           line_index: Optional[LineIndex] = None) -> CodeMetrics:
         """Calculate code metrics"""
-        total, blank, comment = CodeUtils.count_lines(code)
+        if line_index is None:
+            line_index = LineIndex.from_code(code)
+        total, blank, comment = CodeUtils.count_lines(code, line_index)
         
         metrics = CodeMetrics(
             lines_of_code=total - blank - comment,
@@ -763,18 +1206,19 @@ class CodeReviewOrchestrator:
         )
         
         if language == Language.PYTHON:
-            complexity = self.tools.calculate_complexity(code)
+            if analysis is None:
+                analysis = UnifiedPythonAnalyzer.from_code(code)
+            complexity = self.tools.calculate_complexity(code, analysis)
             metrics.cyclomatic_complexity = complexity['cyclomatic']
             metrics.cognitive_complexity = complexity['cognitive']
             metrics.nesting_depth = complexity['max_nesting']
             metrics.maintainability_index = self.tools.calculate_maintainability_index(
-                code, complexity['cyclomatic']
+                code, complexity['cyclomatic'], line_index
             )
             
-            ast_result = self.tools.analyze_ast(code)
-            if ast_result.get('valid'):
-                metrics.function_count = len(ast_result.get('functions', []))
-                metrics.class_count = len(ast_result.get('classes', []))
+            if analysis.valid:
+                metrics.function_count = len(analysis.functions)
+                metrics.class_count = len(analysis.classes)
         
         return metrics
 
@@ -782,119 +1226,594 @@ class CodeReviewOrchestrator:
 # GEMINI AI INTEGRATION
 # ============================================================
 
+# Invariant parts of the review prompt; code and issues are spliced in between
+PROMPT_HEADS = {
+    lang: (f"You are an expert {lang.value} code reviewer. Analyze this code and provide specific fixes.\n"
+           f"\n## Code:\n```{lang.value}\n")
+    for lang in Language
+}
+PROMPT_ISSUES = "\n```\n\n## Issues Detected:\n"
+# Same for one submission of a batched prompt
+SUBMISSION_HEADS = {lang: f"```{lang.value}\n" for lang in Language}
+SUBMISSION_ISSUES = "\n```\nIssues:\n"
+PROMPT_TAIL = """
+
+## Your Task:
+1. Explain each issue briefly (1-2 sentences)
+2. Provide corrected code snippets
+3. Give best practice recommendations
+
+Keep your response concise and actionable. Use markdown formatting.
+"""
+
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+
+# genai.configure() sets process-wide credentials, so it runs once per key and
+# every reviewer shares the resulting model. genai caches one async client per
+# process, so all calls multiplex over one long-lived HTTP/2 channel, used
+# only from the reviewer's single loop. The transport is left at genai's
+# default: an explicit transport='grpc' would give the async client a
+# blocking channel whose responses cannot be awaited.
+_gemini_lock = threading.Lock()
+_gemini_key: Optional[str] = None
+_gemini_model = None
+
+def shared_gemini_model(api_key: str):
+    """Return the process-wide Gemini model, configuring genai on first use"""
+    global _gemini_key, _gemini_model
+    with _gemini_lock:
+        if _gemini_model is None or api_key != _gemini_key:
+            genai.configure(api_key=api_key)
+            transport = type(genai_client.get_default_generative_async_client().transport)
+            if 'AsyncIO' not in transport.__name__:
+                raise RuntimeError(f"Gemini async client uses blocking transport {transport.__name__}")
+            _gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+            _gemini_key = api_key
+        return _gemini_model
+
 class GeminiCodeReviewer:
     """Gemini AI-powered code reviewer"""
     
+    # Successful suggestions are reused for identical code, issues and language
+    SUGGESTION_CACHE_SIZE = 1024
+    SUGGESTION_TTL = 3600.0
+    # Longer code is cut off in prompts to stay well inside the context window
+    MAX_PROMPT_CODE_CHARS = 32_000
+    # Per-call deadline, and exponential backoff on transient errors
+    REQUEST_TIMEOUT = 30.0
+    # Streamed answers may run long: the whole call gets a generous deadline,
+    # and it is abandoned if no piece arrives for STREAM_IDLE_TIMEOUT
+    STREAM_TIMEOUT = 600.0
+    STREAM_IDLE_TIMEOUT = 30.0
+    MAX_ATTEMPTS = 4
+    RETRY_INITIAL_DELAY = 0.5
+    RETRY_MAX_DELAY = 8.0
+    
     def __init__(self, api_key: str = None):
         self.model = None
         self.available = False
+        # LRU of (expiry, text) keyed by _suggestion_key
+        self._suggestions: 'OrderedDict[tuple, Tuple[float, str]]' = OrderedDict()
+        self._suggestions_lock = threading.Lock()
+        # The async Gemini client is bound to the loop it first ran on, so all
+        # requests go through one long-lived loop on a background thread
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
         
         if GENAI_AVAILABLE:
             key = api_key or os.environ.get('GOOGLE_API_KEY')
             if key:
                 try:
-                    genai.configure(api_key=key)
-                    self.model = genai.GenerativeModel('gemini-2.0-flash')
+                    self.model = shared_gemini_model(key)
                     self.available = True
                 except Exception as e:
                     print(f"Failed to initialize Gemini: {e}")
     
     def get_suggestions(self, code: str, issues: List[CodeIssue], 
                         language: Language = Language.PYTHON) -> Optional[str]:
-        """Get AI-powered suggestions"""
-        if not self.available:
+        """Get AI-powered suggestions (blocking)"""
+        if not self.available or not issues:
             return None
+        key = self._suggestion_key(code, issues, language)
+        cached = self._cached_suggestion(key)
+        if cached is not None:
+            return cached
+        return self._submit(self._suggest(code, issues, language, key)).result()
+    
+    async def aget_suggestions(self, code: str, issues: List[CodeIssue],
+                               language: Language = Language.PYTHON) -> Optional[str]:
+        """Get AI-powered suggestions without blocking the caller's event loop"""
+        if not self.available or not issues:
+            return None
+        key = self._suggestion_key(code, issues, language)
+        cached = self._cached_suggestion(key)
+        if cached is not None:
+            return cached
+        return await asyncio.wrap_future(self._submit(self._suggest(code, issues, language, key)))
+    
+    def stream_suggestions(self, code: str, issues: List[CodeIssue],
+                           language: Language = Language.PYTHON) -> Iterator[str]:
+        """Yield AI-powered suggestions piece by piece as Gemini produces them
         
-        issues_text = "\n".join([
-            f"{i+1}. [{issue.severity.value.upper()}] {issue.message}" + 
-            (f" (Line {issue.line_number})" if issue.line_number else "")
-            for i, issue in enumerate(issues[:10])
-        ])
+        The request runs on the reviewer's event loop; pieces are handed to
+        the calling thread through a queue that ends with None.
+        """
+        if not self.available or not issues:
+            return
+        key = self._suggestion_key(code, issues, language)
+        cached = self._cached_suggestion(key)
+        if cached is not None:
+            yield cached
+            return
         
-        prompt = f"""You are an expert {language.value} code reviewer. Analyze this code and provide specific fixes.
+        pieces: 'queue.Queue[Optional[str]]' = queue.Queue()
+        future = self._submit(self._stream(self._build_prompt(code, issues, language), key, pieces))
+        try:
+            while True:
+                text = pieces.get()
+                if text is None:
+                    return
+                yield text
+        finally:
+            # Stop the request if the client went away mid-stream
+            future.cancel()
+    
+    async def _stream(self, prompt: str, key: tuple, pieces: 'queue.Queue[Optional[str]]'):
+        """Stream a Gemini response into ``pieces``, retrying transient errors"""
+        parts = []
+        try:
+            for attempt in range(self.MAX_ATTEMPTS):
+                try:
+                    response = await asyncio.wait_for(self.model.generate_content_async(
+                        prompt, stream=True, request_options={'timeout': self.STREAM_TIMEOUT}),
+                        self.STREAM_IDLE_TIMEOUT)
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.STREAM_IDLE_TIMEOUT)
+                        except StopAsyncIteration:
+                            break
+                        text = chunk.text
+                        parts.append(text)
+                        pieces.put(text)
+                    break
+                except Exception as e:
+                    stalled = isinstance(e, asyncio.TimeoutError)
+                    # Only retry while nothing has been sent on to the client
+                    if parts or attempt == self.MAX_ATTEMPTS - 1 or not (stalled or isinstance(e, GEMINI_TRANSIENT_ERRORS)):
+                        reason = f"no response for {self.STREAM_IDLE_TIMEOUT:g} s" if stalled else str(e)
+                        pieces.put(f"Error getting AI suggestions: {reason}")
+                        return
+                await asyncio.sleep(self._retry_delay(attempt))
+            self._store_suggestion(key, "".join(parts))
+        finally:
+            pieces.put(None)
+    
+    def _submit(self, coro) -> 'concurrent.futures.Future':
+        """Schedule a coroutine on the reviewer's event loop, starting it on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever,
+                                 name="gemini-loop", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
+    async def _suggest(self, code: str, issues: List[CodeIssue], language: Language,
+                       key: Optional[tuple] = None) -> str:
+        """Ask Gemini for suggestions, caching the text on success"""
+        try:
+            text = await self._request(self._build_prompt(code, issues, language))
+        except Exception as e:
+            return f"Error getting AI suggestions: {str(e)}"
+        self._store_suggestion(key or self._suggestion_key(code, issues, language), text)
+        return text
+    
+    async def _request(self, prompt: str) -> str:
+        """Send a prompt to Gemini and return the response text, retrying transient errors"""
+        for attempt in range(self.MAX_ATTEMPTS):
+            try:
+                response = await self.model.generate_content_async(
+                    prompt, request_options={'timeout': self.REQUEST_TIMEOUT})
+                return response.text
+            except GEMINI_TRANSIENT_ERRORS:
+                if attempt == self.MAX_ATTEMPTS - 1:
+                    raise
+            await asyncio.sleep(self._retry_delay(attempt))
+    
+    @classmethod
+    def _retry_delay(cls, attempt: int) -> float:
+        """Exponential backoff with jitter before retry number ``attempt + 1``"""
+        return min(cls.RETRY_MAX_DELAY, cls.RETRY_INITIAL_DELAY * 2 ** attempt) + random.uniform(0, cls.RETRY_INITIAL_DELAY)
+    
+    @staticmethod
+    def _suggestion_key(code: str, issues: List[CodeIssue], language: Language) -> tuple:
+        """Cache key covering everything that goes into the prompt"""
+        return (
+            hashlib.blake2b(code.encode('utf-8'), digest_size=16).digest(),
+            tuple((i.severity.value, i.message, i.line_number) for i in issues[:10]),
+            language.value
+        )
+    
+    def _cached_suggestion(self, key: tuple) -> Optional[str]:
+        """Return an unexpired cached suggestion, if any"""
+        with self._suggestions_lock:
+            entry = self._suggestions.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._suggestions[key]
+                return None
+            self._suggestions.move_to_end(key)
+            return entry[1]
+    
+    def _store_suggestion(self, key: tuple, text: str):
+        """Cache a suggestion, evicting the least recently used entry when full"""
+        with self._suggestions_lock:
+            self._suggestions[key] = (time.monotonic() + self.SUGGESTION_TTL, text)
+            self._suggestions.move_to_end(key)
+            if len(self._suggestions) > self.SUGGESTION_CACHE_SIZE:
+                self._suggestions.popitem(last=False)
+    
+    @classmethod
+    def _prompt_code(cls, code: str) -> str:
+        """Code as included in prompts, truncated past MAX_PROMPT_CODE_CHARS"""
+        if len(code) > cls.MAX_PROMPT_CODE_CHARS:
+            return code[:cls.MAX_PROMPT_CODE_CHARS] + "\n# ...truncated..."
+        return code
+    
+    @staticmethod
+    def _format_issues(issues: List[CodeIssue]) -> str:
+        """Numbered list of the first ten issues"""
+        parts = []
+        for i, issue in enumerate(issues[:10], 1):
+            if issue.line_number:
+                parts.append(f"{i}. [{issue.severity.value.upper()}] {issue.message} (Line {issue.line_number})")
+            else:
+                parts.append(f"{i}. [{issue.severity.value.upper()}] {issue.message}")
+        return "\n".join(parts)
+    
+    @classmethod
+    def _build_prompt(cls, code: str, issues: List[CodeIssue], language: Language) -> str:
+        """Build the review prompt for the first ten issues"""
+        return "".join((PROMPT_HEADS[language], cls._prompt_code(code), PROMPT_ISSUES, cls._format_issues(issues), PROMPT_TAIL))
 
-## Code:
-```{language.value}
-{code}
-```
+class BatchingGeminiReviewer:
+    """Coalesces concurrent suggestion requests into shared Gemini calls
+    
+    Submissions are dispatched as soon as the worker sees them; those from
+    the same client that are already queued together are sent as one prompt,
+    and the reply is split back per request. The client is an opaque id the
+    caller vouches for (the web app uses a random id kept in the signed
+    session cookie); submissions with different or no client ids never share
+    a prompt. Batches are capped at MAX_BATCH submissions and
+    MAX_PROMPT_CHARS of submission text. Each batch uses a random delimiter
+    token, and unless the reply contains exactly one response per
+    submission, in order, every submission is retried alone.
+    """
+    
+    MAX_BATCH = 8
+    MAX_PROMPT_CHARS = 6000
+    
+    BATCH_HEAD = """You are an expert code reviewer. Review each submission below independently and provide specific fixes.
 
-## Issues Detected:
-{issues_text}
+For every submission k, start its review with a line containing only "### RESPONSE {token} k".
+Do not write that line anywhere else.
 
-## Your Task:
+"""
+    BATCH_TAIL = """## Your Task (for each submission):
 1. Explain each issue briefly (1-2 sentences)
 2. Provide corrected code snippets
 3. Give best practice recommendations
 
-Keep your response concise and actionable. Use markdown formatting.
+Keep each response concise and actionable. Use markdown formatting.
 """
+    
+    def __init__(self, reviewer: GeminiCodeReviewer):
+        self.reviewer = reviewer
+        # Created on the reviewer's event loop, which is the only one touching it
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # The loop only holds weak references to tasks, so in-flight
+        # dispatches are kept here until they finish
+        self._tasks: Set[asyncio.Task] = set()
+    
+    @property
+    def available(self) -> bool:
+        return self.reviewer.available
+    
+    def get_suggestions(self, code: str, issues: List[CodeIssue],
+                        language: Language = Language.PYTHON,
+                        client: Optional[str] = None) -> Optional[str]:
+        """Get AI-powered suggestions (blocking)"""
+        if not self.available or not issues:
+            return None
+        cached = self.reviewer._cached_suggestion(self.reviewer._suggestion_key(code, issues, language))
+        if cached is not None:
+            return cached
+        return self.reviewer._submit(self._enqueue(code, issues, language, client)).result()
+    
+    async def aget_suggestions(self, code: str, issues: List[CodeIssue],
+                               language: Language = Language.PYTHON,
+                               client: Optional[str] = None) -> Optional[str]:
+        """Get AI-powered suggestions, possibly sharing a Gemini call with the
+        same client's other requests; a request without a client is sent alone"""
+        if not self.available or not issues:
+            return None
+        cached = self.reviewer._cached_suggestion(self.reviewer._suggestion_key(code, issues, language))
+        if cached is not None:
+            return cached
+        return await asyncio.wrap_future(self.reviewer._submit(self._enqueue(code, issues, language, client)))
+    
+    async def _enqueue(self, code: str, issues: List[CodeIssue], language: Language,
+                       client: Optional[str]) -> str:
+        """Queue a submission for the next batch and wait for its response"""
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._micro_batch_worker())
+        future = loop.create_future()
+        section = "".join((SUBMISSION_HEADS[language], self.reviewer._prompt_code(code),
+                           SUBMISSION_ISSUES, self.reviewer._format_issues(issues), "\n\n"))
+        await self._queue.put((section, code, issues, language, future, client))
+        return await future
+    
+    async def _micro_batch_worker(self):
+        """Dispatch queued submissions without waiting for more to arrive"""
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            
+            for batch in self._batches(pending):
+                task = loop.create_task(self._dispatch(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+    
+    @classmethod
+    def _batches(cls, pending: List[tuple]) -> List[List[tuple]]:
+        """Group submissions by client, keeping order and the batch limits"""
+        open_batches: Dict[str, Tuple[List[tuple], int]] = {}
+        batches = []
+        for item in pending:
+            client = item[5]
+            if client is None:
+                batches.append([item])
+                continue
+            batch, size = open_batches.get(client, (None, 0))
+            if batch is None or len(batch) >= cls.MAX_BATCH or size + len(item[0]) > cls.MAX_PROMPT_CHARS:
+                batch, size = [], 0
+                batches.append(batch)
+            batch.append(item)
+            open_batches[client] = (batch, size + len(item[0]))
+        return batches
+    
+    async def _dispatch(self, batch: List[tuple]):
+        """Send one batch to Gemini and resolve each caller's future"""
+        if len(batch) == 1:
+            _, code, issues, language, future, _ = batch[0]
+            self._resolve(future, await self.reviewer._suggest(code, issues, language))
+            return
+        
+        # A fresh token per batch, so submitted code cannot forge a delimiter
+        token = secrets.token_hex(8)
+        parts = [self.BATCH_HEAD.format(token=token)]
+        for k, item in enumerate(batch, 1):
+            parts.append(f"### SUBMISSION {token} {k}\n")
+            parts.append(item[0])
+        parts.append(self.BATCH_TAIL)
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            text = await self.reviewer._request("".join(parts))
         except Exception as e:
-            return f"Error getting AI suggestions: {str(e)}"
+            for item in batch:
+                self._resolve(item[4], f"Error getting AI suggestions: {str(e)}")
+            return
+        
+        # Split the reply on its "### RESPONSE <token> k" markers
+        marker = re.compile(rf'^[ \t]*#+[ \t]*RESPONSE[ \t]+{token}[ \t]+(\d+)[ \t]*$', re.MULTILINE)
+        pieces = marker.split(text)
+        numbers = [int(k) for k in pieces[1::2]]
+        responses = [body.strip() for body in pieces[2::2]]
+        
+        # Anything but exactly one non-empty response per submission, in
+        # order, means the reply cannot be attributed safely
+        if numbers != list(range(1, len(batch) + 1)) or not all(responses):
+            await asyncio.gather(*(self._dispatch([item]) for item in batch))
+            return
+        
+        for (_, code, issues, language, future, _), response in zip(batch, responses):
+            self.reviewer._store_suggestion(
+                self.reviewer._suggestion_key(code, issues, language), response)
+            self._resolve(future, response)
+    
+    @staticmethod
+    def _resolve(future: asyncio.Future, text: str):
+        """Deliver a response unless the caller has stopped waiting"""
+        if not future.done():
+            future.set_result(text)
 
 # ============================================================
 # FLASK WEB APPLICATION
 # ============================================================
 
-app = Flask(__name__)
-CORS(app)
-
-# Initialize components
+# Process-wide components, built once at import. Under `gunicorn --preload`
+# the master builds them and forked workers share them copy-on-write; the
+# agent threads and the Gemini event loop are only started on first use.
 orchestrator = CodeReviewOrchestrator()
 gemini_reviewer = GeminiCodeReviewer()
+batching_reviewer = BatchingGeminiReviewer(gemini_reviewer)
+
+# Review requests with a larger body are rejected before parsing
+MAX_REVIEW_BYTES = 1_000_000
+
+api = Blueprint('api', __name__)
+
+def json_response(obj: Any, status: int = 200) -> Response:
+    """JSON response, encoded with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+    response = jsonify(obj)
+    response.status_code = status
+    return response
+
+# The page is static HTML, so browsers may reuse it for an hour and then
+# revalidate with its ETag
+INDEX_MAX_AGE = 3600
 
-@app.route('/')
+@api.route('/')
 def index():
     """Serve the main page"""
-    return render_template('index.html')
+    directory = os.path.join(current_app.root_path, current_app.template_folder)
+    return send_from_directory(directory, 'index.html', max_age=INDEX_MAX_AGE)
+
+def payload_too_large() -> Response:
+    """Error response for review bodies over MAX_REVIEW_BYTES"""
+    return json_response({'error': 'Payload too large'}, 413)
+
+@api.errorhandler(RequestEntityTooLarge)
+def handle_payload_too_large(e: RequestEntityTooLarge) -> Response:
+    """Answer oversized bodies with the same JSON error as the explicit check"""
+    return payload_too_large()
+
+def review_client_id() -> str:
+    """Random id identifying this browser session, kept in the signed cookie
+    
+    Only requests carrying the same id may share a batched Gemini prompt, so
+    users behind one proxy address are never mixed. Clients that do not keep
+    cookies get a fresh id each time and are never batched.
+    """
+    client = session.get('review_client')
+    if not isinstance(client, str):
+        client = session['review_client'] = secrets.token_hex(16)
+    return client
 
-@app.route('/api/review', methods=['POST'])
-def api_review():
+def parse_review_request() -> Optional[Tuple[str, Optional[Language], bool]]:
+    """Read code, requested language and the AI flag from a review request
+    
+    Returns None when the body is not a JSON object. The body is not cached
+    on the request, since it is only read once.
+    """
+    body = request.get_data(cache=False)
+    # Without a Content-Length, Werkzeug stops reading at MAX_CONTENT_LENGTH
+    # instead of failing, so a body that reaches the limit was cut short
+    if request.content_length is None and len(body) >= MAX_REVIEW_BYTES:
+        raise RequestEntityTooLarge()
+    if not request.is_json:
+        return None
+    try:
+        data = orjson.loads(body) if ORJSON_AVAILABLE else json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    code = data.get('code', '')
+    language_str = data.get('language')
+    include_ai = data.get('include_ai', False)
+    
+    # Detect or parse language
+    language = None
+    if language_str:
+        try:
+            language = Language(language_str)
+        except ValueError:
+            language = None
+    
+    return code, language, include_ai
+
+@api.route('/api/review', methods=['POST'])
+async def api_review():
     """API endpoint for code review"""
+    if (request.content_length or 0) > MAX_REVIEW_BYTES:
+        return payload_too_large()
+    
     try:
-        data = request.get_json()
-        code = data.get('code', '')
-        language_str = data.get('language')
-        include_ai = data.get('include_ai', False)
+        parsed = parse_review_request()
+        if parsed is None:
+            return json_response({'error': 'Invalid JSON body'}), 400
+        code, language, include_ai = parsed
         
         if not code.strip():
-            return jsonify({'error': 'No code provided'}), 400
+            return json_response({'error': 'No code provided'}), 400
         
-        # Detect or parse language
-        language = None
-        if language_str:
-            try:
-                language = Language(language_str)
-            except ValueError:
-                language = None
-        
-        # Perform review
-        result = orchestrator.review_code(code, language)
+        # Perform review off the event loop so concurrent requests interleave
+        result = await asyncio.to_thread(orchestrator.review_code, code, language)
         
         # Get AI suggestions if requested
         if include_ai and result.issues:
-            ai_suggestions = gemini_reviewer.get_suggestions(
-                code, result.issues, result.language
+            ai_suggestions = await batching_reviewer.aget_suggestions(
+                code, result.issues, result.language, client=review_client_id()
             )
             result.ai_suggestions = ai_suggestions
         
-        return jsonify(result.to_dict())
+        return json_response(result.to_dict())
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        return json_response({'error': str(e)}), 500
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event with a JSON payload"""
+    payload = orjson.dumps(data).decode() if ORJSON_AVAILABLE else json.dumps(data)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+@api.route('/api/review/stream', methods=['POST'])
+def api_review_stream():
+    """Code review as server-sent events: the static review first, then AI suggestions as they arrive"""
+    if (request.content_length or 0) > MAX_REVIEW_BYTES:
+        return payload_too_large()
     
+    try:
+        parsed = parse_review_request()
+        if parsed is None:
+            return json_response({'error': 'Invalid JSON body'}), 400
+        code, language, include_ai = parsed
+        
+        if not code.strip():
+            return json_response({'error': 'No code provided'}), 400
+        
+        result = orchestrator.review_code(code, language)
+    except HTTPException:
+        raise
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
+    
+    def events():
+        yield sse_event('review', result.to_dict())
+        if include_ai and result.issues:
+            for delta in gemini_reviewer.stream_suggestions(code, result.issues, result.language):
+                yield sse_event('suggestion', {'delta': delta})
+        yield sse_event('done', {})
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-@app.route('/api/health')
+@api.route('/api/health')
 def health():
     """Health check endpoint"""
-    return jsonify({
+    return json_response({
         'status': 'healthy',
         'gemini_available': gemini_reviewer.available,
         'agents': [a.name for a in orchestrator.agents]
     })
 
+def create_app() -> Flask:
+    """Create the web application around the shared review components"""
+    flask_app = Flask(__name__)
+    # Requests declaring a larger Content-Length are rejected before reading;
+    # see parse_review_request for bodies sent without one
+    flask_app.config['MAX_CONTENT_LENGTH'] = MAX_REVIEW_BYTES
+    # Signs the session cookie holding the batching client id. Without
+    # FLASK_SECRET_KEY a random key is made per process, which `--preload`
+    # shares with all workers; sessions then end when the server restarts.
+    flask_app.secret_key = os.environ.get('FLASK_SECRET_KEY') or secrets.token_hex(32)
+    CORS(flask_app)
+    flask_app.register_blueprint(api)
+    return flask_app
+
+app = create_app()
+
 # ============================================================
 # MAIN
 # ============================================================
@@ -907,8 +1826,11 @@ if __name__ == '__main__':
     print(f"Agents Loaded: {len(orchestrator.agents)}")
     for agent in orchestrator.agents:
         print(f"   - {agent.name}")
-    print("\nStarting web server...")
+    # Debug mode (reloader + debugger) only when asked for, e.g. FLASK_DEBUG=1
+    debug = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes')
+    print("\nStarting development server" + (" (debug)" if debug else "") + "...")
+    print("For production use: gunicorn --preload -w 4 -k gthread --threads 16 -b 0.0.0.0:5000 wsgi:app")
     print("Access at: http://localhost:5000")
     print("\n" + "="*60 + "\n")
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=debug, threaded=True)
\ No newline at end of file
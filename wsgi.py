@@ -0,0 +1,10 @@
+"""
+Production entry point for the Code Review Agent
+================================================
+
+gunicorn --preload -w 4 -k gthread --threads 16 -b 0.0.0.0:5000 wsgi:app
+"""
+
+from code_review_agent import app
+
+__all__ = ['app']